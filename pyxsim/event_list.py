@@ -7,6 +7,7 @@ from astropy.io import fits
 import astropy.wcs as pywcs
 import h5py
 from pyxsim.utils import parse_value
+from pyxsim.lib.sky_functions import bin_events, fov_mask
 import os
 
 
@@ -83,38 +84,45 @@ class EventList:
         wcs.wcs.ctype = ["RA---TAN", "DEC--TAN"]
         wcs.wcs.cunit = ["deg"]*2
 
-        n_events = 0
-
-        e = []
-        x = []
-        y = []
-        for fn in self.filenames:
+        e = np.empty(self.tot_num_events)
+        xsky = np.empty(self.tot_num_events)
+        ysky = np.empty(self.tot_num_events)
+        start = 0
+        for fn, n in zip(self.filenames, self.num_events):
             with h5py.File(fn, "r") as f:
                 d = f["data"]
-                xx, yy = wcs.wcs_world2pix(d["xsky"][:], d["ysky"][:], 1)
-                keepx = np.logical_and(xx >= 0.5, xx <= float(nx)+0.5)
-                keepy = np.logical_and(yy >= 0.5, yy <= float(nx)+0.5)
-                keep = np.logical_and(keepx, keepy)
-                n_events += keep.sum()
-                e.append(d["eobs"][keep])
-                x.append(xx[keep])
-                y.append(yy[keep])
+                sel = np.s_[start:start+n]
+                d["eobs"].read_direct(e, dest_sel=sel)
+                d["xsky"].read_direct(xsky, dest_sel=sel)
+                d["ysky"].read_direct(ysky, dest_sel=sel)
+            start += n
+
+        # Convert all of the events to pixel coordinates in one go
+        x, y = wcs.wcs_world2pix(xsky, ysky, 1)
+        del xsky, ysky
+
+        # Gather each column with the same index array, so the mask is
+        # only scanned once
+        keep = np.flatnonzero(fov_mask(x, y, float(nx)+0.5, float(nx)+0.5))
+        n_events = keep.size
 
         mylog.info(f"Threw out {self.tot_num_events-n_events} events because "
                    f"they fell outside the field of view.")
 
-        col_e = fits.Column(name='ENERGY', format='E', unit='eV',
-                            array=np.concatenate(e)*1000.0)
-        col_x = fits.Column(name='X', format='D', unit='pixel',
-                            array=np.concatenate(x))
-        col_y = fits.Column(name='Y', format='D', unit='pixel',
-                            array=np.concatenate(y))
-
-        cols = [col_e, col_x, col_y]
+        # Gather the events straight into the (big-endian) rows of the
+        # table, rather than building separate columns which would then
+        # be copied into a new table
+        events = np.empty(n_events, dtype=[("ENERGY", ">f4"), ("X", ">f4"),
+                                           ("Y", ">f4")])
+        np.multiply(e[keep], 1000.0, out=events["ENERGY"])
+        events["X"] = x[keep]
+        events["Y"] = y[keep]
 
-        coldefs = fits.ColDefs(cols)
-        tbhdu = fits.BinTableHDU.from_columns(coldefs)
+        tbhdu = fits.BinTableHDU(events)
         tbhdu.name = "EVENTS"
+        tbhdu.columns["ENERGY"].unit = "eV"
+        tbhdu.columns["X"].unit = "pixel"
+        tbhdu.columns["Y"].unit = "pixel"
 
         tbhdu.header["MTYPE1"] = "sky"
         tbhdu.header["MFORM1"] = "x,y"
@@ -164,7 +172,7 @@ class EventList:
         overwrite : boolean, optional
             Set to True to overwrite previous files.
         """
-        import unyt as u
+        from yt.utilities.physical_ratios import erg_per_keV
         from soxs.simput import SimputCatalog, SimputPhotonList
 
         simput_file = f"{prefix}_simput.fits"
@@ -180,11 +188,12 @@ class EventList:
             with h5py.File(fn, "r") as f:
                 d = f["data"]
                 if d["eobs"].shape[0] > 0:
-                    flux = np.sum(d["eobs"][()]*u.keV).to_value("erg") / \
+                    eobs = d["eobs"][()]
+                    flux = np.sum(eobs)*erg_per_keV / \
                            self.parameters["exp_time"]/self.parameters["area"]
 
                     src = SimputPhotonList(d["xsky"][()], d["ysky"][()],
-                                           d["eobs"][()], flux, name=name)
+                                           eobs, flux, name=name)
 
                     if begin_cat:
                         cat = SimputCatalog.from_source(simput_file, src,
@@ -220,16 +229,14 @@ class EventList:
         """
         fov = parse_value(fov, "arcmin")
 
+        energy_cut = emin is not None or emax is not None
         if emin is None:
-            emin = -1.0
+            emin = -np.inf
         if emax is None:
-            emax = 1.0e10
+            emax = np.inf
 
         dtheta = fov.to_value("deg")/nx
 
-        xbins = np.linspace(0.5, float(nx)+0.5, nx+1, endpoint=True)
-        ybins = np.linspace(0.5, float(nx)+0.5, nx+1, endpoint=True)
-
         wcs = pywcs.WCS(naxis=2)
         wcs.wcs.crpix = [0.5*(nx+1)]*2
         wcs.wcs.crval = self.parameters["sky_center"]
@@ -242,13 +249,18 @@ class EventList:
         for fn in self.filenames:
             with h5py.File(fn, "r") as f:
                 d = f["data"]
-                mask = np.logical_and(d["eobs"][:] >= emin, 
-                                      d["eobs"][:] <= emax)
-                xx, yy = wcs.wcs_world2pix(d["xsky"][mask], 
-                                           d["ysky"][mask], 1)
-                H += np.histogram2d(xx, yy, bins=[xbins, ybins])[0]
-
-        hdu = fits.PrimaryHDU(H.T)
+                xsky = d["xsky"][()]
+                ysky = d["ysky"][()]
+                if energy_cut:
+                    eobs = d["eobs"][()]
+                    mask = np.flatnonzero((eobs >= emin) & (eobs <= emax))
+                    xsky = xsky[mask]
+                    ysky = ysky[mask]
+                # Only convert the events which survive the energy cut
+                xx, yy = wcs.wcs_world2pix(xsky, ysky, 1)
+                bin_events(xx, yy, H)
+
+        hdu = fits.PrimaryHDU(H)
 
         hdu.header["MTYPE1"] = "EQPOS"
         hdu.header["MFORM1"] = "RA,DEC"
@@ -290,8 +302,10 @@ class EventList:
 
         for fn in self.filenames:
             with h5py.File(fn, "r") as f:
-                d = f["data"]
-                spec += np.histogram(d["eobs"][:], bins=ebins)[0]
+                eobs = f["data"]["eobs"][()]
+            # With equal-width bins given as a range, np.histogram computes
+            # the channels directly rather than searching the edges
+            spec += np.histogram(eobs, bins=nchan, range=(emin, emax))[0]
 
         col1 = fits.Column(name='CHANNEL', format='1J', 
                            array=np.arange(nchan).astype('int32')+1)
@@ -64,15 +64,13 @@ def scatter_events(normal, prng, kernel, data_type,
             yax = 1
     
         if data_type == "cells":
-            xsky = prng.uniform(low=-0.5, high=0.5, size=num_det)
-            ysky = prng.uniform(low=-0.5, high=0.5, size=num_det)
+            xsky, ysky = prng.uniform(low=-0.5, high=0.5, size=(2, num_det))
         elif data_type == "particles":
             if kernel == "gaussian":
-                xsky = prng.normal(loc=0.0, scale=1.0, size=num_det)
-                ysky = prng.normal(loc=0.0, scale=1.0, size=num_det)
+                xsky, ysky = prng.normal(loc=0.0, scale=1.0, size=(2, num_det))
             elif kernel == "top_hat":
-                r = prng.uniform(low=0.0, high=1.0, size=num_det)
-                theta = 2.0*np.pi*prng.uniform(low=0.0, high=1.0, size=num_det)
+                r, theta = prng.uniform(low=0.0, high=1.0, size=(2, num_det))
+                theta *= 2.0*np.pi
                 xsky = r*np.cos(theta)
                 ysky = r*np.sin(theta)
     
@@ -114,11 +112,10 @@ def scatter_events(normal, prng, kernel, data_type,
                     n += 1
         elif data_type  == "particles":
             if kernel == "gaussian":
-                xsky = prng.normal(loc=0.0, scale=1.0, size=num_det)
-                ysky = prng.normal(loc=0.0, scale=1.0, size=num_det)
+                xsky, ysky = prng.normal(loc=0.0, scale=1.0, size=(2, num_det))
             elif kernel == "top_hat":
-                r = prng.uniform(low=0.0, high=1.0, size=num_det)
-                theta = 2.0*np.pi*prng.uniform(low=0.0, high=1.0, size=num_det)
+                r, theta = prng.uniform(low=0.0, high=1.0, size=(2, num_det))
+                theta *= 2.0*np.pi
                 xsky = r*np.cos(theta)
                 ysky = r*np.sin(theta)
             for i in range(num_cells):
@@ -164,3 +161,50 @@ def pixel_to_cel(np.ndarray[np.float64_t, ndim=1] xsky,
 
         xsky[i] *= 180.0/PI
         ysky[i] *= 180.0/PI
+
+
+@cython.cdivision(True)
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def bin_events(np.ndarray[np.float64_t, ndim=1] x,
+               np.ndarray[np.float64_t, ndim=1] y,
+               np.ndarray[np.float64_t, ndim=2] image):
+
+    cdef np.int64_t i, ix, iy
+    cdef np.int64_t n = x.shape[0]
+    cdef np.int64_t ny = image.shape[0]
+    cdef np.int64_t nx = image.shape[1]
+    cdef np.float64_t xmax = nx + 0.5
+    cdef np.float64_t ymax = ny + 0.5
+
+    for i in range(n):
+        # Pixels have unit width with edges at 0.5, 1.5, ..., and
+        # events on the upper edge go into the last pixel
+        if not (x[i] >= 0.5 and x[i] <= xmax and
+                y[i] >= 0.5 and y[i] <= ymax):
+            continue
+        ix = <np.int64_t>(x[i] - 0.5)
+        iy = <np.int64_t>(y[i] - 0.5)
+        if ix == nx:
+            ix = nx - 1
+        if iy == ny:
+            iy = ny - 1
+        image[iy, ix] += 1.0
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def fov_mask(np.ndarray[np.float64_t, ndim=1] x,
+             np.ndarray[np.float64_t, ndim=1] y,
+             np.float64_t xmax, np.float64_t ymax):
+
+    cdef np.int64_t i
+    cdef np.int64_t n = x.shape[0]
+    cdef np.ndarray[np.uint8_t, ndim=1] keep = np.empty(n, dtype="uint8")
+
+    # Same pixel edges as bin_events, tested in a single pass
+    for i in range(n):
+        keep[i] = (x[i] >= 0.5 and x[i] <= xmax and
+                   y[i] >= 0.5 and y[i] <= ymax)
+
+    return keep.view("bool")
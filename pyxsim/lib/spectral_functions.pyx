@@ -0,0 +1,76 @@
+import numpy as np
+cimport numpy as np
+cimport cython
+
+
+cdef inline np.int64_t find_channel(np.float32_t* cdf, np.int64_t nchan,
+                                    np.float64_t u) nogil:
+    # Binary search for cdf[lo] <= u < cdf[lo+1], which assumes
+    # cdf[0] = 0 and cdf[nchan] = 1
+    cdef np.int64_t lo = 0
+    cdef np.int64_t hi = nchan
+    cdef np.int64_t mid
+    while hi - lo > 1:
+        mid = (lo + hi) >> 1
+        if cdf[mid] <= u:
+            lo = mid
+        else:
+            hi = mid
+    return lo
+
+
+@cython.cdivision(True)
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def invert_cdf(np.ndarray[np.float32_t, ndim=2, mode="c"] cumspec,
+               np.ndarray[np.float64_t, ndim=1] ebins,
+               np.ndarray[np.int64_t, ndim=1] counts,
+               np.ndarray[np.float64_t, ndim=1] randvec,
+               np.ndarray[np.float64_t, ndim=1] energies):
+
+    cdef np.int64_t ncells = cumspec.shape[0]
+    cdef np.int64_t nchan = cumspec.shape[1]-1
+    cdef np.int64_t i, j, k, lo
+    cdef np.float64_t u
+    cdef np.float32_t* cdf
+    cdef np.float32_t* cdfs = <np.float32_t*>np.PyArray_DATA(cumspec)
+
+    # Each row of cumspec is the CDF for the next counts[i] photons, and
+    # their energies are interpolated within the channels they fall in.
+    # randvec[k] is read before energies[k] is written, so the two may be
+    # the same array.
+    k = 0
+    with nogil:
+        for i in range(ncells):
+            cdf = cdfs + i*(nchan+1)
+            for j in range(counts[i]):
+                u = randvec[k]
+                lo = find_channel(cdf, nchan, u)
+                energies[k] = ebins[lo] + (u-cdf[lo]) * \
+                              (ebins[lo+1]-ebins[lo])/(cdf[lo+1]-cdf[lo])
+                k += 1
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def sample_channels(np.ndarray[np.float32_t, ndim=2, mode="c"] cumspec,
+                    np.ndarray[np.float64_t, ndim=1] emid,
+                    np.ndarray[np.int64_t, ndim=1] counts,
+                    np.ndarray[np.float64_t, ndim=1] randvec,
+                    np.ndarray[np.float64_t, ndim=1] energies):
+
+    cdef np.int64_t ncells = cumspec.shape[0]
+    cdef np.int64_t nchan = cumspec.shape[1]-1
+    cdef np.int64_t i, j, k
+    cdef np.float32_t* cdf
+    cdef np.float32_t* cdfs = <np.float32_t*>np.PyArray_DATA(cumspec)
+
+    # Same as invert_cdf, but the photons are given the energies of the
+    # centers of the channels they fall in
+    k = 0
+    with nogil:
+        for i in range(ncells):
+            cdf = cdfs + i*(nchan+1)
+            for j in range(counts[i]):
+                energies[k] = emid[find_channel(cdf, nchan, randvec[k])]
+                k += 1
@@ -1,14 +1,12 @@
 import time
 
 from pyxsim.photon_list import make_photons, project_photons
-from pyxsim.utils import parse_value
+from pyxsim.utils import parse_value, parse_prng
 
 from yt_astro_analysis.cosmological_observation.api import LightCone
 
 from yt.loaders import load
 
-from soxs.utils import parse_prng
-
 from yt.utilities.parallel_tools.parallel_analysis_interface import \
     communication_system
 
@@ -91,10 +89,10 @@ class XrayLightCone(LightCone):
             Should probably only be used for visualization purposes. Supply a
             float here to smooth with a standard deviation with this fraction
             of the cell size. Default: None
-        prng : integer or :class:`~numpy.random.RandomState` object
+        prng : integer, :class:`~numpy.random.Generator`, or :class:`~numpy.random.RandomState` object
             A pseudo-random number generator. Typically will only be specified
             if you have a reason to generate the same set of random numbers, such as for a
-            test. Default is to use the :mod:`numpy.random` module.
+            test. Default is a new :class:`~numpy.random.Generator`.
         """
         prng = parse_prng(prng)
 
@@ -13,8 +13,7 @@ from yt.utilities.parallel_tools.parallel_analysis_interface import \
 from yt.units.yt_array import YTArray
 import h5py
 from pyxsim.spectral_models import absorb_models
-from pyxsim.utils import parse_value, mylog
-from soxs.utils import parse_prng
+from pyxsim.utils import parse_value, mylog, parse_prng
 
 comm = communication_system.communicators[-1]
 
@@ -282,7 +281,8 @@ def make_photons(photon_prefix, data_source, redshift, area,
         else:
             dtype = "float64"
         d.create_dataset(field, data=np.zeros(init_chunk, dtype=dtype),
-                         maxshape=(None,), dtype=dtype, chunks=True)
+                         maxshape=(None,), dtype=dtype, chunks=True,
+                         compression="lzf", shuffle=True)
 
     f.flush()
 
@@ -413,11 +413,11 @@ def project_photons(photon_prefix, event_prefix, normal, sky_center,
     kernel : string, optional
         The kernel used when smoothing positions of X-rays originating from
         SPH particles, "gaussian" or "top_hat". Default: "top_hat".
-    prng : integer or :class:`~numpy.random.RandomState` object 
+    prng : integer, :class:`~numpy.random.Generator`, or :class:`~numpy.random.RandomState` object 
         A pseudo-random number generator. Typically will only be specified
         if you have a reason to generate the same set of random numbers,
-        such as for a test. Default is to use the :mod:`numpy.random`
-        module.
+        such as for a test. Default is a new
+        :class:`~numpy.random.Generator`.
 
     Returns
     -------
@@ -514,7 +514,8 @@ def project_photons(photon_prefix, event_prefix, normal, sky_center,
         de = fe.create_group("data")
         for field in event_fields:
             de.create_dataset(field, data=np.zeros(init_chunk),
-                              maxshape=(None,), chunks=True)
+                              maxshape=(None,), chunks=True,
+                              compression="lzf", shuffle=True)
 
         if isinstance(normal, str):
             norm = "xyz".index(normal)
@@ -559,10 +560,17 @@ def project_photons(photon_prefix, event_prefix, normal, sky_center,
                                             d["z"][start_c:end_c],
                                             dx, x_hat, y_hat)
 
+                # Only gather the detected photons if some were absorbed
+                all_det = num_det == eobs.size
+
                 if data_type == "cells" and sigma_pos is not None:
-                    sigma = sigma_pos*np.repeat(dx, n_ph)[det]
-                    xsky += sigma*prng.normal(loc=0.0, scale=1.0, size=num_det)
-                    ysky += sigma*prng.normal(loc=0.0, scale=1.0, size=num_det)
+                    sigma = sigma_pos*np.repeat(dx, n_ph)
+                    if not all_det:
+                        sigma = sigma[det]
+                    dsky = prng.normal(loc=0.0, scale=1.0, size=(2, num_det))
+                    dsky *= sigma
+                    xsky += dsky[0]
+                    ysky += dsky[1]
 
                 xsky /= D_A
                 ysky /= D_A
@@ -577,7 +585,9 @@ def project_photons(photon_prefix, event_prefix, normal, sky_center,
 
                 de["xsky"][e_offset:e_offset+num_det] = xsky
                 de["ysky"][e_offset:e_offset+num_det] = ysky
-                de["eobs"][e_offset:e_offset+num_det] = eobs[det]
+                if not all_det:
+                    eobs = eobs[det]
+                de["eobs"][e_offset:e_offset+num_det] = eobs
 
                 n_events += num_det
                 e_offset = n_events
@@ -2,19 +2,20 @@
 Classes for specific source models
 """
 import numpy as np
-from yt.funcs import ensure_numpy_array
 from tqdm.auto import tqdm
 from pyxsim.utils import mylog
-from yt.units.yt_array import YTQuantity
+from yt.units.yt_array import YTArray, YTQuantity
 from yt.utilities.physical_constants import clight
 from pyxsim.spectral_models import thermal_models
-from pyxsim.utils import parse_value, isunitful
-from soxs.utils import parse_prng
+from pyxsim.utils import parse_value, isunitful, parse_prng
+from pyxsim.lib.spectral_functions import invert_cdf, sample_channels
 from soxs.constants import elem_names, atomic_weights, metal_elem
 from yt.utilities.exceptions import YTFieldNotFound
 from yt.utilities.parallel_tools.parallel_analysis_interface import \
     parallel_objects, communication_system, parallel_capable
 from numbers import Number
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 
 comm = communication_system.communicators[-1]
 
@@ -141,10 +142,15 @@ class ThermalSourceModel(SourceModel):
         "wilm" : from Wilms, Allen & McCray (2000, ApJ 542, 914 
         except for elements not listed which are given zero abundance)
         "lodd" : from Lodders, K (2003, ApJ 591, 1220)
-    prng : integer or :class:`~numpy.random.RandomState` object 
+    prng : integer, :class:`~numpy.random.Generator`, or :class:`~numpy.random.RandomState` object 
         A pseudo-random number generator. Typically will only be specified
         if you have a reason to generate the same set of random numbers, 
-        such as for a test. Default is to use the :mod:`numpy.random` module.
+        such as for a test. Default is a new :class:`~numpy.random.Generator`.
+    nthreads : integer, optional
+        The number of threads used to generate the photon energies of the
+        different temperature bins in a chunk at the same time. When running
+        in parallel with MPI, keep this small so that the processes on a node
+        are not oversubscribed. Default: 1
 
     Examples
     --------
@@ -157,12 +163,16 @@ class ThermalSourceModel(SourceModel):
                  max_density=5.0e-25, var_elem=None, method="invert_cdf", 
                  thermal_broad=True, model_root=None, model_vers=None, 
                  nei=False, nolines=False, abund_table="angr",
-                 prng=None):
+                 prng=None, nthreads=1):
         if isinstance(spectral_model, str):
             if spectral_model not in thermal_models:
                 raise KeyError(f"{spectral_model} is not a known thermal "
                                f"spectral model!")
             spectral_model = thermal_models[spectral_model]
+        if method not in ["invert_cdf", "accept_reject"]:
+            raise ValueError(f"{method} is not a valid method for "
+                             f"generating photon energies! Choose "
+                             f"'invert_cdf' or 'accept_reject'.")
         self.temperature_field = temperature_field
         self.Zmet = Zmet
         self.nei = nei
@@ -186,6 +196,7 @@ class ThermalSourceModel(SourceModel):
         self.var_ion_keys = self.spectral_model.var_ion_names
         self.method = method
         self.prng = parse_prng(prng)
+        self.nthreads = nthreads
         self.kT_min = kT_min
         self.kT_max = kT_max
         self.kT_scale = kT_scale
@@ -200,6 +211,7 @@ class ThermalSourceModel(SourceModel):
         self.abund_table = abund_table
         self.atable = self.spectral_model.atable
         self.mconvert = {}
+        self.mconvert_arr = None
         if max_density is not None:
             if not isinstance(max_density, YTQuantity):
                 if isinstance(max_density, tuple):
@@ -210,6 +222,11 @@ class ThermalSourceModel(SourceModel):
         self.density_field = None  # Will be determined later
         self.tot_num_cells = 0  # Will be determined later
         self.ftype = "gas"
+        self.tot_ph_c = None
+        self.tot_ph_m = None
+        self.tot_ph_v = None
+        self.max_cached_spectra = 100
+        self._spectra = OrderedDict()
 
     def setup_model(self, data_source, redshift, spectral_norm):
         if self.emission_measure_field is None:
@@ -253,6 +270,14 @@ class ThermalSourceModel(SourceModel):
                     else:
                         raise RuntimeError(f"I don't understand units of "
                                            f"{m_units} for element {key}!")
+        # The conversion factors in the same order as the rows of elemZ
+        # in __call__, with 1.0 for elements given as constant floats
+        if self.nei:
+            elem_keys = self.var_ion_keys
+        else:
+            elem_keys = self.var_elem_keys
+        self.mconvert_arr = np.array([self.mconvert.get(key, 1.0)
+                                      for key in elem_keys])
         self.density_field = (ftype, "density")
         mylog.info(f"Using emission measure field "
                    f"'{self.emission_measure_field}'.")
@@ -271,6 +296,7 @@ class ThermalSourceModel(SourceModel):
                                        np.log10(self.kT_max),
                                        num=self.n_kT+1)
         self.dkT = np.diff(self.kT_bins)
+        self._setup_tables()
         citer = data_source.chunks([], "io")
         num_cells = 0
         for chunk in parallel_objects(citer):
@@ -279,17 +305,72 @@ class ThermalSourceModel(SourceModel):
         if parallel_capable:
             self.pbar = ParallelProgressBar("Processing cells/particles ")
         else:
+            # The bar is updated once per kT bin, so don't redraw it more
+            # than once a second
             self.pbar = tqdm(leave=True, total=self.tot_num_cells,
-                             desc="Processing cells/particles ")
+                             desc="Processing cells/particles ",
+                             mininterval=1.0)
 
     def cleanup_model(self):
         self.emission_measure_field = None
         self.temperature_field = None
         self.pbar.close()
 
+    def _setup_tables(self):
+        # The total photon counts of the spectra in every kT bin are
+        # tabulated up front. The spectra themselves would take up
+        # n_kT*nchan values each, so they are only cached as they are
+        # needed (see _get_spectra)
+        self._spectra.clear()
+        kT_mid = self.kT_bins[:-1] + 0.5*self.dkT
+        self.tot_ph_v = np.zeros((self.n_kT, self.num_var_elem))
+        if hasattr(self.spectral_model, "get_spectrum_totals"):
+            self.tot_ph_c, self.tot_ph_m, tot_ph_v = \
+                self.spectral_model.get_spectrum_totals(kT_mid)
+            if tot_ph_v is not None:
+                self.tot_ph_v[:] = tot_ph_v
+            return
+        # Spectral models which can only give whole spectra
+        self.tot_ph_c = np.zeros(self.n_kT)
+        self.tot_ph_m = np.zeros(self.n_kT)
+        for ikT, kT in enumerate(kT_mid):
+            cspec, mspec, vspec = self.spectral_model.get_spectrum(kT)
+            self.tot_ph_c[ikT] = cspec.d.sum()
+            self.tot_ph_m[ikT] = mspec.d.sum()
+            if vspec is not None:
+                self.tot_ph_v[ikT] = vspec.d.sum(axis=-1)
+
+    def _get_spectra(self, ikT):
+        # Every chunk with cells in a given kT bin needs the same cumulative
+        # spectra, so the most recently used bins are kept around rather
+        # than rebuilt per chunk
+        if ikT in self._spectra:
+            self._spectra.move_to_end(ikT)
+            return self._spectra[ikT]
+        kT = self.kT_bins[ikT] + 0.5*self.dkT[ikT]
+        cspec, mspec, vspec = self.spectral_model.get_spectrum(kT)
+        nchan = cspec.size
+        # The cosmic, metal, and variable element spectra are stacked as
+        # rows, so that the CDFs of many cells can be built from them with
+        # a single matrix product
+        cumspec = np.empty((2+self.num_var_elem, nchan+1))
+        cumspec[:, 0] = 0.0
+        np.cumsum(cspec.d, out=cumspec[0, 1:])
+        np.cumsum(mspec.d, out=cumspec[1, 1:])
+        if vspec is not None:
+            np.cumsum(vspec.d, axis=1, out=cumspec[2:, 1:])
+        # The sums are done in double precision, but single precision is
+        # plenty for storing the spectra and building CDFs from them, and
+        # halves the memory they take up
+        cumspec = cumspec.astype("float32")
+        self._spectra[ikT] = cumspec
+        if len(self._spectra) > self.max_cached_spectra:
+            self._spectra.popitem(last=False)
+        return cumspec
+
     def __call__(self, chunk):
 
-        num_photons_max = 10000000
+        cdf_size_max = 5000000
         emid = self.spectral_model.emid
         ebins = self.spectral_model.ebins
         nchan = len(emid)
@@ -297,20 +378,26 @@ class ThermalSourceModel(SourceModel):
         orig_ncells = chunk[self.temperature_field].size
         if orig_ncells == 0:
             return
-        if self.max_density is None:
-            dens_cut = np.ones(orig_ncells, dtype="bool")
-        else:
-            dens_cut = chunk[self.density_field] < self.max_density
-        kT = np.atleast_1d(
-            chunk[self.temperature_field].to_value("keV", "thermal"))
-        EM = np.atleast_1d(chunk[self.emission_measure_field].d*dens_cut)
-
-        idxs = np.argsort(kT)
-
-        kT_sorted = kT[idxs]
-        idx_min = np.searchsorted(kT_sorted, self.kT_min)
-        idx_max = np.searchsorted(kT_sorted, self.kT_max)
-        idxs = idxs[idx_min:idx_max]
+        T = chunk[self.temperature_field]
+        # Make the temperature cut in the units of the field, so that only
+        # the temperatures of the cells that pass it are converted to keV.
+        # The bounds need the field's unit registry, since the field may be
+        # in code units that only the dataset knows about.
+        T_min, T_max = YTArray([self.kT_min, self.kT_max], "keV",
+                               registry=T.units.registry).to_value(
+                                   T.units, "thermal")
+        T = np.atleast_1d(T)
+
+        # Apply the temperature and density cuts together, so that only
+        # the cells which survive both are sorted and processed
+        cut = (T.d >= T_min) & (T.d < T_max)
+        if self.max_density is not None:
+            cut &= chunk[self.density_field] < self.max_density
+        idxs = np.flatnonzero(cut)
+        kT = T[idxs].to_value("keV", "thermal")
+        sort_idxs = np.argsort(kT)
+        idxs = idxs[sort_idxs]
+        kT_sorted = kT[sort_idxs]
         num_cells = len(idxs)
 
         if num_cells == 0:
@@ -319,19 +406,16 @@ class ThermalSourceModel(SourceModel):
         else:
             self.pbar.update(orig_ncells-num_cells)
 
-        kT_idxs = np.digitize(kT[idxs], self.kT_bins)-1
-        bcounts = np.bincount(kT_idxs).astype("int")
-        bcounts = bcounts[bcounts > 0]
-        n = int(0)
-        bcell = []
-        ecell = []
-        for bcount in bcounts:
-            bcell.append(n)
-            ecell.append(n+bcount)
-            n += bcount
-        kT_idxs = np.unique(kT_idxs)
+        # The cells are sorted by temperature, so the cells in each kT bin
+        # lie between the positions of the bin edges in the sorted list
+        edges = np.searchsorted(kT_sorted, self.kT_bins)
+        bcounts = np.diff(edges)
+        kT_idxs = np.nonzero(bcounts)[0]
+        bcounts = bcounts[kT_idxs]
+        bcell = edges[kT_idxs]
+        ecell = edges[kT_idxs+1]
 
-        cell_em = EM[idxs]*self.spectral_norm
+        cell_em = chunk[self.emission_measure_field].d[idxs]*self.spectral_norm
 
         if self.nei:
             metalZ = np.zeros(num_cells)
@@ -341,113 +425,119 @@ class ThermalSourceModel(SourceModel):
             if isinstance(self.Zmet, float):
                 metalZ = self.Zmet*np.ones(num_cells)
             else:
-                metalZ = np.atleast_1d(chunk[self.Zmet].d[idxs]*
-                                       self.Zconvert)
+                metalZ = chunk[self.Zmet].d[idxs]*self.Zconvert
 
         elemZ = None
         if self.num_var_elem > 0:
-            elemZ = np.zeros((self.num_var_elem, num_cells))
+            elemZ = np.empty((self.num_var_elem, num_cells))
             for j, key in enumerate(elem_keys):
                 value = self.var_elem[key]
                 if isinstance(value, float):
                     elemZ[j, :] = value
                 else:
-                    elemZ[j, :] = np.atleast_1d(chunk[value].d[idxs]*
-                                                self.mconvert[key])
-
-        number_of_photons = np.zeros(num_cells, dtype="int64")
-        energies = np.zeros(num_photons_max)
-
-        start_e = 0
-        end_e = 0
-
-        for ibegin, iend, bcount, ikT in zip(bcell, ecell, bcounts, kT_idxs):
-
-            self.pbar.update(bcount)
-
-            kT = self.kT_bins[ikT] + 0.5*self.dkT[ikT]
-
-            cem = cell_em[ibegin:iend]
-
-            cspec, mspec, vspec = self.spectral_model.get_spectrum(kT)
-
-            tot_ph_c = cspec.d.sum()
-            tot_ph_m = mspec.d.sum()
-
-            cell_norm_c = tot_ph_c*cem
-            cell_norm_m = tot_ph_m*metalZ[ibegin:iend]*cem
-            cell_norm = cell_norm_c + cell_norm_m
-
-            if vspec is not None:
-                cell_norm_v = np.zeros(cem.size)
-                for j in range(self.num_var_elem):
-                    tot_ph_v = vspec.d[j, :].sum()
-                    cell_norm_v += tot_ph_v*elemZ[j, ibegin:iend]*cem
-                cell_norm += cell_norm_v
-
-            cell_n = ensure_numpy_array(self.prng.poisson(lam=cell_norm))
+                    elemZ[j, :] = chunk[value].d[idxs]
+            elemZ *= self.mconvert_arr[:, np.newaxis]
+
+        # The weights of the cosmic, metal, and variable element spectra
+        # in each cell
+        spec_wts = np.empty((num_cells, 2+self.num_var_elem), dtype="float32")
+        spec_wts[:, 0] = 1.0
+        spec_wts[:, 1] = metalZ
+        if elemZ is not None:
+            spec_wts[:, 2:] = elemZ.T
+
+        # Find the number of photons in every cell first, so that the
+        # energies can be stored in an array of exactly the right size.
+        # The photon totals of each cell's kT bin are looked up from the
+        # tables for all of the binned cells at once.
+        cell_norm = np.zeros(num_cells)
+        binned = slice(edges[0], edges[-1])
+        cell_kT = np.repeat(kT_idxs, bcounts)
+        norm = self.tot_ph_c[cell_kT] + metalZ[binned]*self.tot_ph_m[cell_kT]
+        if self.num_var_elem > 0:
+            norm += (elemZ[:, binned]*self.tot_ph_v[cell_kT].T).sum(axis=0)
+        cell_norm[binned] = norm*cell_em[binned]
+
+        # A RandomState gives C longs, which are only 32 bits on some
+        # platforms, and the sampling kernels take 64-bit counts
+        number_of_photons = self.prng.poisson(lam=cell_norm).astype(
+            "int64", copy=False)
+
+        # Where each cell's photons begin in the energies array, so that
+        # the photons of a kT bin span [e_edges[ibegin], e_edges[iend])
+        e_edges = np.zeros(num_cells+1, dtype="int64")
+        np.cumsum(number_of_photons, out=e_edges[1:])
+
+        # The random numbers for every photon are drawn up front, so that
+        # the energies do not depend on the order the kT bins are done in.
+        # The kernels read each one before writing the energy in its place,
+        # so they are drawn straight into the energies array.
+        energies = self.prng.uniform(size=e_edges[-1])
+
+        block_size = max(cdf_size_max // (nchan+1), 1)
+
+        def sample_bin(cumspec_bin, cells):
+            # Build the normalized CDFs of the cells with photons as rows
+            # of one array, a block of cells at a time so that the array
+            # never gets too large. Each bin only writes to the slice of
+            # energies that belongs to its own cells.
+            for bbegin in range(0, cells.size, block_size):
+                bcells = cells[bbegin:bbegin+block_size]
+                cumspec = np.matmul(spec_wts[bcells], cumspec_bin)
+                cumspec /= cumspec[:, -1:]
+                cn = number_of_photons[bcells]
+                ei = e_edges[bcells[0]]
+                ee = e_edges[bcells[-1]+1]
+                if self.method == "invert_cdf":
+                    invert_cdf(cumspec, ebins, cn, energies[ei:ee],
+                               energies[ei:ee])
+                elif self.method == "accept_reject":
+                    sample_channels(cumspec, emid, cn, energies[ei:ee],
+                                    energies[ei:ee])
 
-            number_of_photons[ibegin:iend] = cell_n
+        pbar_update = self.pbar.update
 
-            end_e += int(cell_n.sum())
+        executor = None
+        if self.nthreads > 1:
+            executor = ThreadPoolExecutor(max_workers=self.nthreads)
+        pending = deque()
 
-            if self.method == "invert_cdf":
-                cumspec_c = np.insert(np.cumsum(cspec.d), 0, 0.0)
-                cumspec_m = np.insert(np.cumsum(mspec.d), 0, 0.0)
-                if vspec is None:
-                    cumspec_v = None
-                else:
-                    cumspec_v = np.zeros((self.num_var_elem, nchan+1))
-                    for j in range(self.num_var_elem):
-                        cumspec_v[j, 1:] = np.cumsum(vspec.d[j, :])
-
-            ei = start_e
-            for icell in range(ibegin, iend):
-                cn = number_of_photons[icell]
-                if cn == 0:
+        try:
+            for ibegin, iend, bcount, ikT in zip(bcell, ecell, bcounts,
+                                                 kT_idxs):
+                pbar_update(bcount)
+                cells = np.flatnonzero(number_of_photons[ibegin:iend])
+                if cells.size == 0:
                     continue
-                # The rather verbose form of the few next statements is a
-                # result of code optimization and shouldn't be changed
-                # without checking for perfomance degradation. See
-                # https://bitbucket.org/yt_analysis/yt/pull-requests/1766
-                # for details.
-                if self.method == "invert_cdf":
-                    cumspec = cumspec_c
-                    cumspec += metalZ[icell] * cumspec_m
-                    if cumspec_v is not None:
-                        for j in range(self.num_var_elem):
-                            cumspec += elemZ[j, icell]*cumspec_v[j, :]
-                    norm_factor = 1.0 / cumspec[-1]
-                    cumspec *= norm_factor
-                    randvec = self.prng.uniform(size=cn)
-                    randvec.sort()
-                    cell_e = np.interp(randvec, cumspec, ebins)
-                elif self.method == "accept_reject":
-                    tot_spec = cspec.d
-                    tot_spec += metalZ[icell] * mspec.d
-                    if vspec is not None:
-                        for j in range(self.num_var_elem):
-                            tot_spec += elemZ[j, icell]*vspec.d[j, :]
-                    norm_factor = 1.0 / tot_spec.sum()
-                    tot_spec *= norm_factor
-                    eidxs = self.prng.choice(nchan, size=cn, p=tot_spec)
-                    cell_e = emid[eidxs]
-                while ei+cn > num_photons_max:
-                    num_photons_max *= 2
-                if num_photons_max > energies.size:
-                    energies.resize(num_photons_max, refcheck=False)
-                energies[ei:ei+cn] = cell_e
-                ei += cn
-
-            start_e = end_e
+                cells += ibegin
+                # The spectra are fetched in this thread, since neither the
+                # cache nor the spectral model are safe to share between
+                # threads
+                cumspec_bin = self._get_spectra(ikT)
+                if executor is None:
+                    sample_bin(cumspec_bin, cells)
+                else:
+                    pending.append(executor.submit(sample_bin, cumspec_bin,
+                                                   cells))
+                    # Don't let the spectra of queued bins pile up
+                    if len(pending) > 2*self.nthreads:
+                        pending.popleft().result()
+            while pending:
+                pending.popleft().result()
+        finally:
+            if executor is not None:
+                for future in pending:
+                    future.cancel()
+                executor.shutdown()
 
         active_cells = number_of_photons > 0
         idxs = idxs[active_cells]
         ncells = idxs.size
 
-        return ncells, number_of_photons[active_cells], idxs, energies[:end_e].copy()
+        return ncells, number_of_photons[active_cells], idxs, energies
 
     def cleanup_model(self):
+        self._spectra.clear()
         self.pbar.close()
 
 
@@ -473,10 +563,10 @@ class PowerLawSourceModel(SourceModel):
     index : float, string, or (ftype, fname) tuple
         The power-law index of the spectrum. Either a float for a single power law or
         the name of a field that corresponds to the power law.
-    prng : integer or :class:`~numpy.random.RandomState` object 
+    prng : integer, :class:`~numpy.random.Generator`, or :class:`~numpy.random.RandomState` object 
         A pseudo-random number generator. Typically will only be specified
         if you have a reason to generate the same set of random numbers, such as for a
-        test. Default is to use the :mod:`numpy.random` module.
+        test. Default is a new :class:`~numpy.random.Generator`.
 
     Examples
     --------
@@ -519,26 +609,28 @@ class PowerLawSourceModel(SourceModel):
 
         number_of_photons = self.prng.poisson(lam=norm)
 
-        energies = np.zeros(number_of_photons.sum())
-
-        start_e = 0
-        end_e = 0
-        for i in range(num_cells):
-            if number_of_photons[i] > 0:
-                end_e = start_e+number_of_photons[i]
-                u = self.prng.uniform(size=number_of_photons[i])
-                if alpha[i] == 1:
-                    e = self.emin.v*(self.emax.v/self.emin.v)**u
-                else:
-                    e = self.emin.v**(1.-alpha[i]) + u*norm_fac[i]
-                    e **= 1./(1.-alpha[i])
-                energies[start_e:end_e] = e * self.scale_factor
-                start_e = end_e
+        n_ph = number_of_photons.sum()
+
+        # Draw the photons of all of the cells at once, with each cell's
+        # spectral parameters repeated for each of its photons
+        u = self.prng.uniform(size=n_ph)
+        alpha = np.repeat(alpha, number_of_photons)
+        norm_fac = np.repeat(norm_fac, number_of_photons)
+        energies = np.empty(n_ph)
+        alpha_one = alpha == 1
+        energies[alpha_one] = \
+            self.emin.v*(self.emax.v/self.emin.v)**u[alpha_one]
+        alpha_other = ~alpha_one
+        oma = 1.-alpha[alpha_other]
+        e = self.emin.v**oma + u[alpha_other]*norm_fac[alpha_other]
+        e **= 1./oma
+        energies[alpha_other] = e
+        energies *= self.scale_factor
 
         active_cells = number_of_photons > 0
         ncells = active_cells.sum()
 
-        return ncells, number_of_photons[active_cells], active_cells, energies[:end_e].copy()
+        return ncells, number_of_photons[active_cells], active_cells, energies
 
 
 class LineSourceModel(SourceModel):
@@ -561,10 +653,10 @@ class LineSourceModel(SourceModel):
         are assumed to be in keV. If set to a field name, the line broadening
         is assumed to be based on this field (in units of velocity or energy).
         If set to None (the default), it is assumed that the line is unbroadened.
-    prng : integer or :class:`~numpy.random.RandomState` object 
+    prng : integer, :class:`~numpy.random.Generator`, or :class:`~numpy.random.RandomState` object 
         A pseudo-random number generator. Typically will only be specified
         if you have a reason to generate the same set of random numbers, such as for a
-        test. Default is to use the :mod:`numpy.random` module.
+        test. Default is a new :class:`~numpy.random.Generator`.
 
     Examples
     --------
@@ -601,28 +693,24 @@ class LineSourceModel(SourceModel):
         self.ftype = data_source.ds._get_field_info(self.emission_field).name[0]
 
     def __call__(self, chunk):
-        num_cells = len(chunk[self.emission_field])
         F = chunk[self.emission_field]*self.spectral_norm*self.scale_factor
         number_of_photons = self.prng.poisson(lam=F.in_cgs().v)
 
-        energies = self.e0*np.ones(number_of_photons.sum())
+        # Energies are in keV, kept as plain arrays to avoid unit overhead
+        energies = self.e0.v*np.ones(number_of_photons.sum())
 
         if isinstance(self.sigma, YTQuantity):
             dE = self.prng.normal(loc=0.0, scale=float(self.sigma),
-                                  size=number_of_photons.sum())*self.e0.uq
+                                  size=number_of_photons.sum())
             energies += dE
         elif self.sigma is not None:
-            sigma = (chunk[self.sigma]*self.e0/clight).in_units("keV")
-            start_e = 0
-            for i in range(num_cells):
-                if number_of_photons[i] > 0:
-                    end_e = start_e+number_of_photons[i]
-                    dE = self.prng.normal(loc=0.0, scale=float(sigma[i]),
-                                          size=number_of_photons[i])*self.e0.uq
-                    energies[start_e:end_e] += dE
-                    start_e = end_e
-
-        energies = energies * self.scale_factor
+            sigma = (chunk[self.sigma]*self.e0/clight).to_value("keV")
+            # One draw for all of the photons, each with its cell's width
+            dE = self.prng.normal(loc=0.0,
+                                  scale=np.repeat(sigma, number_of_photons))
+            energies += dE
+
+        energies *= self.scale_factor
 
         active_cells = number_of_photons > 0
         ncells = active_cells.sum()
@@ -5,8 +5,8 @@ import numpy as np
 
 from soxs.spectra import ApecGenerator, \
     get_wabs_absorb, get_tbabs_absorb
-from soxs.utils import parse_prng
 from yt.units.yt_array import YTArray, YTQuantity
+from pyxsim.utils import parse_prng
 
 
 class TableApecModel(ApecGenerator):
@@ -91,6 +91,14 @@ class TableApecModel(ApecGenerator):
             self.var_spec = var_spec
         else:
             self.var_spec = YTArray(var_spec, "cm**3/s")
+        # The interpolation in get_spectrum is linear, so the totals of the
+        # spectra at any kT can be interpolated from the totals of the rows
+        self._cosmic_tot = cosmic_spec.sum(axis=-1)
+        self._metal_tot = metal_spec.sum(axis=-1)
+        if var_spec is None:
+            self._var_tot = None
+        else:
+            self._var_tot = var_spec.sum(axis=-1)
 
     def get_spectrum(self, kT):
         """
@@ -104,19 +112,41 @@ class TableApecModel(ApecGenerator):
             if self.var_spec is not None:
                 var_spec = YTArray(np.zeros((self.num_var_elem, self.nchan)), "cm**3/s")
         else:
+            # Interpolate on the bare arrays and attach units at the end
             dT = (kT-self.Tvals[tindex])/self.dTvals[tindex]
-            cspec_l = self.cosmic_spec[tindex, :]
-            mspec_l = self.metal_spec[tindex, :]
-            cspec_r = self.cosmic_spec[tindex+1, :]
-            mspec_r = self.metal_spec[tindex+1, :]
-            cosmic_spec = cspec_l*(1.-dT)+cspec_r*dT
-            metal_spec = mspec_l*(1.-dT)+mspec_r*dT
+            cspec_l = self.cosmic_spec.d[tindex, :]
+            mspec_l = self.metal_spec.d[tindex, :]
+            cspec_r = self.cosmic_spec.d[tindex+1, :]
+            mspec_r = self.metal_spec.d[tindex+1, :]
+            cosmic_spec = YTArray(cspec_l*(1.-dT)+cspec_r*dT, "cm**3/s")
+            metal_spec = YTArray(mspec_l*(1.-dT)+mspec_r*dT, "cm**3/s")
             if self.var_spec is not None:
-                vspec_l = self.var_spec[:, tindex, :]
-                vspec_r = self.var_spec[:, tindex+1, :]
-                var_spec = vspec_l*(1.-dT) + vspec_r*dT
+                vspec_l = self.var_spec.d[:, tindex, :]
+                vspec_r = self.var_spec.d[:, tindex+1, :]
+                var_spec = YTArray(vspec_l*(1.-dT) + vspec_r*dT, "cm**3/s")
         return cosmic_spec, metal_spec, var_spec
 
+    def get_spectrum_totals(self, kT):
+        """
+        Get the totals over all channels of the cosmic, metal, and variable
+        element spectra given an array of temperatures *kT* in keV, without
+        building the spectra themselves.
+        """
+        kT = np.asarray(kT)
+        tindex = np.searchsorted(self.Tvals, kT)-1
+        inside = (tindex >= 0) & (tindex < self.Tvals.shape[0]-1)
+        tindex = np.clip(tindex, 0, self.Tvals.shape[0]-2)
+        dT = np.where(inside, (kT-self.Tvals[tindex])/self.dTvals[tindex], 0.0)
+        # Temperatures off the table get zero emission, as in get_spectrum
+        wl = np.where(inside, 1.0-dT, 0.0)
+        cosmic_tot = self._cosmic_tot[tindex]*wl + self._cosmic_tot[tindex+1]*dT
+        metal_tot = self._metal_tot[tindex]*wl + self._metal_tot[tindex+1]*dT
+        var_tot = None
+        if self._var_tot is not None:
+            var_tot = (self._var_tot[:, tindex]*wl +
+                       self._var_tot[:, tindex+1]*dT).T
+        return cosmic_tot, metal_tot, var_tot
+
     def return_spectrum(self, temperature, metallicity, redshift, norm,
                         velocity=0.0, elem_abund=None):
         """
@@ -172,10 +202,10 @@ class AbsorptionModel:
         ----------
         eobs : array_like
             The energies of the photons in keV.
-        prng : integer, :class:`~numpy.random.RandomState` object or :mod:`~numpy.random`, optional
+        prng : integer, :class:`~numpy.random.Generator`, or :class:`~numpy.random.RandomState` object, optional
             A pseudo-random number generator. Typically will only be specified
             if you have a reason to generate the same set of random numbers, such as for a
-            test. Default is the :mod:`numpy.random` module.
+            test. Default is a new :class:`~numpy.random.Generator`.
         """
         prng = parse_prng(prng)
         n_events = eobs.size
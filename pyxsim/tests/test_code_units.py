@@ -0,0 +1,60 @@
+from pyxsim import ThermalSourceModel, make_photons
+from yt.loaders import load_uniform_grid
+from yt.utilities.physical_ratios import K_per_keV, mass_hydrogen_grams
+from numpy.random import RandomState
+from numpy.testing import assert_array_equal
+import numpy as np
+import h5py
+import os
+import tempfile
+import shutil
+
+
+def test_code_unit_temperature():
+
+    tmpdir = tempfile.mkdtemp()
+    curdir = os.getcwd()
+    os.chdir(tmpdir)
+
+    prng = RandomState(33)
+
+    nx = 16
+    ddims = (nx, nx, nx)
+
+    data = {}
+    data["density"] = (1.0e-3*mass_hydrogen_grams*np.ones(ddims), "g/cm**3")
+    data["temperature"] = (prng.uniform(1.0, 8.0, size=ddims)*K_per_keV,
+                           "code_temperature")
+    data["metallicity"] = (0.3*np.ones(ddims), "Zsun")
+    for ax in "xyz":
+        data[f"velocity_{ax}"] = (np.zeros(ddims), "cm/s")
+    bbox = np.array([[-0.5, 0.5], [-0.5, 0.5], [-0.5, 0.5]])
+    ds = load_uniform_grid(data, ddims, length_unit=(1.0, "Mpc"), bbox=bbox,
+                           default_species_fields="ionized")
+
+    dd = ds.all_data()
+
+    # The raw field is in code units, while ("gas", "temperature") is the
+    # same field in K, so both should give the same photons
+    photons = {}
+    for i, field in enumerate([("stream", "temperature"),
+                               ("gas", "temperature")]):
+        thermal_model = ThermalSourceModel("apec", 0.1, 11.5, 2000,
+                                           ("gas", "metallicity"),
+                                           temperature_field=field,
+                                           prng=45)
+        n_photons, n_cells = make_photons(f"photons_{i}", dd, 0.05, 3000.0,
+                                          1.0e4, thermal_model)
+        assert n_cells == nx**3
+        with h5py.File(f"photons_{i}.h5", "r") as f:
+            photons[i] = {k: f["data"][k][()] for k in f["data"]}
+
+    for k in photons[0]:
+        assert_array_equal(photons[0][k], photons[1][k])
+
+    os.chdir(curdir)
+    shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    test_code_unit_temperature()
@@ -0,0 +1,161 @@
+from pyxsim import EventList
+from numpy.random import RandomState
+from numpy.testing import assert_array_equal, assert_allclose
+import astropy.wcs as pywcs
+from astropy.io import fits
+import numpy as np
+import h5py
+import os
+import tempfile
+import shutil
+
+
+def make_event_file(filename, prng, num_events):
+    with h5py.File(filename, "w") as f:
+        p = f.create_group("parameters")
+        p.create_dataset("exp_time", data=1.0e5)
+        p.create_dataset("area", data=3000.0)
+        p.create_dataset("sky_center", data=np.array([30.0, 45.0]))
+        d = f.create_group("data")
+        d.create_dataset("xsky", data=prng.normal(loc=30.0, scale=0.1,
+                                                  size=num_events))
+        d.create_dataset("ysky", data=prng.normal(loc=45.0, scale=0.1,
+                                                  size=num_events))
+        d.create_dataset("eobs", data=prng.uniform(low=0.1, high=10.0,
+                                                   size=num_events))
+
+
+def test_event_list_image():
+
+    tmpdir = tempfile.mkdtemp()
+    curdir = os.getcwd()
+    os.chdir(tmpdir)
+
+    prng = RandomState(29)
+
+    make_event_file("evt.0000.h5", prng, 50000)
+    make_event_file("evt.0001.h5", prng, 30000)
+
+    events = EventList("evt.*.h5")
+
+    nx = 256
+    fov = 20.0  # arcmin
+    emin = 0.5
+    emax = 2.0
+
+    events.write_fits_image("img.fits", fov, nx, emin=emin, emax=emax,
+                            overwrite=True)
+
+    dtheta = fov/60.0/nx
+
+    wcs = pywcs.WCS(naxis=2)
+    wcs.wcs.crpix = [0.5*(nx+1)]*2
+    wcs.wcs.crval = [30.0, 45.0]
+    wcs.wcs.cdelt = [-dtheta, dtheta]
+    wcs.wcs.ctype = ["RA---TAN", "DEC--TAN"]
+    wcs.wcs.cunit = ["deg"]*2
+
+    bins = np.linspace(0.5, float(nx)+0.5, nx+1, endpoint=True)
+
+    H = np.zeros((nx, nx))
+    for fn in events.filenames:
+        with h5py.File(fn, "r") as f:
+            d = f["data"]
+            mask = np.logical_and(d["eobs"][()] >= emin,
+                                  d["eobs"][()] <= emax)
+            xx, yy = wcs.wcs_world2pix(d["xsky"][()][mask],
+                                       d["ysky"][()][mask], 1)
+            H += np.histogram2d(xx, yy, bins=[bins, bins])[0]
+
+    with fits.open("img.fits") as f:
+        assert_array_equal(f[0].data, H.T)
+
+    os.chdir(curdir)
+    shutil.rmtree(tmpdir)
+
+
+def test_event_list_fits_file():
+
+    tmpdir = tempfile.mkdtemp()
+    curdir = os.getcwd()
+    os.chdir(tmpdir)
+
+    prng = RandomState(31)
+
+    make_event_file("evt.0000.h5", prng, 50000)
+    make_event_file("evt.0001.h5", prng, 30000)
+
+    events = EventList("evt.*.h5")
+
+    nx = 256
+    fov = 20.0  # arcmin
+
+    events.write_fits_file("evt.fits", fov, nx, overwrite=True)
+
+    dtheta = fov/60.0/nx
+
+    wcs = pywcs.WCS(naxis=2)
+    wcs.wcs.crpix = [0.5*(nx+1)]*2
+    wcs.wcs.crval = [30.0, 45.0]
+    wcs.wcs.cdelt = [-dtheta, dtheta]
+    wcs.wcs.ctype = ["RA---TAN", "DEC--TAN"]
+    wcs.wcs.cunit = ["deg"]*2
+
+    e = []
+    x = []
+    y = []
+    for fn in events.filenames:
+        with h5py.File(fn, "r") as f:
+            d = f["data"]
+            xx, yy = wcs.wcs_world2pix(d["xsky"][()], d["ysky"][()], 1)
+            mask = (xx >= 0.5) & (xx <= nx+0.5) & (yy >= 0.5) & (yy <= nx+0.5)
+            e.append(d["eobs"][()][mask]*1000.0)
+            x.append(xx[mask])
+            y.append(yy[mask])
+
+    with fits.open("evt.fits") as f:
+        data = f["EVENTS"].data
+        assert_allclose(data["ENERGY"], np.concatenate(e), rtol=1.0e-6)
+        assert_allclose(data["X"], np.concatenate(x), rtol=1.0e-6)
+        assert_allclose(data["Y"], np.concatenate(y), rtol=1.0e-6)
+
+    os.chdir(curdir)
+    shutil.rmtree(tmpdir)
+
+
+def test_event_list_spectrum():
+
+    tmpdir = tempfile.mkdtemp()
+    curdir = os.getcwd()
+    os.chdir(tmpdir)
+
+    prng = RandomState(37)
+
+    make_event_file("evt.0000.h5", prng, 50000)
+    make_event_file("evt.0001.h5", prng, 30000)
+
+    events = EventList("evt.*.h5")
+
+    emin = 0.5
+    emax = 7.0
+    nchan = 1000
+
+    events.write_spectrum("spec.fits", emin, emax, nchan, overwrite=True)
+
+    ebins = np.linspace(emin, emax, nchan+1)
+    spec = np.zeros(nchan)
+    for fn in events.filenames:
+        with h5py.File(fn, "r") as f:
+            spec += np.histogram(f["data"]["eobs"][()], bins=ebins)[0]
+
+    with fits.open("spec.fits") as f:
+        assert_array_equal(f["SPECTRUM"].data["COUNTS"], spec)
+
+    os.chdir(curdir)
+    shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    test_event_list_image()
+    test_event_list_fits_file()
+    test_event_list_spectrum()
@@ -0,0 +1,69 @@
+import numpy as np
+from numpy.random import RandomState
+from pyxsim.lib.spectral_functions import invert_cdf, sample_channels
+from numpy.testing import assert_allclose, assert_array_equal
+
+
+def test_invert_cdf():
+
+    prng = RandomState(25)
+
+    nchan = 1000
+    ncells = 20
+
+    ebins = np.linspace(0.1, 10.0, nchan+1)
+    spec = prng.uniform(size=(ncells, nchan))
+    # Make sure empty channels are handled
+    spec[:, :10] = 0.0
+    spec[:, 500:550] = 0.0
+    spec[:, -10:] = 0.0
+
+    cumspec = np.zeros((ncells, nchan+1))
+    np.cumsum(spec, axis=1, out=cumspec[:, 1:])
+    cumspec /= cumspec[:, -1:]
+    cumspec = cumspec.astype("float32")
+
+    counts = prng.poisson(lam=5000.0, size=ncells).astype("int64")
+    counts[3] = 0
+    randvec = prng.uniform(size=counts.sum())
+
+    e1 = np.zeros(randvec.size)
+    invert_cdf(cumspec, ebins, counts, randvec, e1)
+
+    e2 = np.zeros(randvec.size)
+    start = 0
+    for i in range(ncells):
+        end = start + counts[i]
+        e2[start:end] = np.interp(randvec[start:end],
+                                  cumspec[i].astype("float64"), ebins)
+        start = end
+
+    assert_allclose(e1, e2)
+
+    # The energies may overwrite the random numbers in place
+    e5 = randvec.copy()
+    invert_cdf(cumspec, ebins, counts, e5, e5)
+    assert_array_equal(e5, e1)
+
+    emid = 0.5*(ebins[1:]+ebins[:-1])
+
+    e3 = np.zeros(randvec.size)
+    sample_channels(cumspec, emid, counts, randvec, e3)
+
+    e4 = np.zeros(randvec.size)
+    start = 0
+    for i in range(ncells):
+        end = start + counts[i]
+        chan = np.searchsorted(cumspec[i], randvec[start:end], side="right")
+        e4[start:end] = emid[chan-1]
+        start = end
+
+    assert_array_equal(e3, e4)
+
+    e6 = randvec.copy()
+    sample_channels(cumspec, emid, counts, e6, e6)
+    assert_array_equal(e6, e3)
+
+
+if __name__ == "__main__":
+    test_invert_cdf()
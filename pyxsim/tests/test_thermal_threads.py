@@ -0,0 +1,51 @@
+from pyxsim import ThermalSourceModel, make_photons
+from pyxsim.tests.utils import BetaModelSource
+from numpy.testing import assert_array_equal
+import h5py
+import os
+import tempfile
+import shutil
+
+
+def test_thermal_threads():
+
+    tmpdir = tempfile.mkdtemp()
+    curdir = os.getcwd()
+    os.chdir(tmpdir)
+
+    bms = BetaModelSource()
+    ds = bms.ds
+
+    # Spread the temperatures over many kT bins, so that there are
+    # several bins for the threads to work on
+    def _varying_temperature(field, data):
+        x = data["index", "x"].to_value("code_length")
+        return data["gas", "temperature"]*(1.0+x)
+
+    ds.add_field(("gas", "varying_temperature"),
+                 function=_varying_temperature, units="K",
+                 sampling_type="cell")
+
+    sphere = ds.sphere("c", (0.5, "Mpc"))
+
+    data = {}
+    for nthreads in [1, 2]:
+        thermal_model = ThermalSourceModel(
+            "apec", 0.1, 11.5, 2000, 0.3, n_kT=1000, prng=24,
+            temperature_field=("gas", "varying_temperature"),
+            nthreads=nthreads)
+        make_photons(f"photons_{nthreads}", sphere, 0.05, 3000.0, 1.0e4,
+                     thermal_model)
+        with h5py.File(f"photons_{nthreads}.h5", "r") as f:
+            data[nthreads] = {k: f["data"][k][()] for k in f["data"]}
+
+    assert data[1]["energy"].size > 0
+    for k in data[1]:
+        assert_array_equal(data[1][k], data[2][k])
+
+    os.chdir(curdir)
+    shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    test_thermal_threads()
@@ -52,6 +52,16 @@ def ensure_list(obj):
     return list(always_iterable(obj))
 
 
+def parse_prng(prng):
+    # Integer seeds (and None) get a PCG64-backed Generator, which is
+    # faster than RandomState for bulk poisson/uniform/normal draws.
+    # Existing RandomState or Generator instances are passed through.
+    if isinstance(prng, (np.random.RandomState, np.random.Generator)):
+        return prng
+    else:
+        return np.random.default_rng(seed=prng)
+
+
 def validate_parameters(first, second, skip=None):
     if skip is None:
         skip = []
@@ -127,7 +137,8 @@ def merge_files(input_files, output_file, overwrite=False,
 
     f_in.close()
 
-    data = defaultdict(list)
+    data_sizes = defaultdict(int)
+    data_types = {}
     tot_exp_time = 0.0
 
     for i, fn in enumerate(input_files):
@@ -136,15 +147,28 @@ def merge_files(input_files, output_file, overwrite=False,
             tot_exp_time += f["/parameters"][exp_time_key][()]
         else:
             tot_exp_time = max(tot_exp_time, f["/parameters"][exp_time_key][()])
-        for key in f["/data"]:
-            data[key].append(f["/data"][key][:])
+        for key, dset in f["/data"].items():
+            data_sizes[key] += dset.size
+            data_types[key] = dset.dtype
         f.close()
 
     p_out[exp_time_key] = tot_exp_time
 
+    # Allocate each merged dataset once at its final size and fill it
+    # file-by-file, so we never hold all of the inputs in memory
     d = f_out.create_group("data")
-    for k in data:
-        d.create_dataset(k, data=np.concatenate(data[k]))
+    for k in data_sizes:
+        d.create_dataset(k, shape=(data_sizes[k],), dtype=data_types[k],
+                         chunks=True, compression="lzf", shuffle=True)
+
+    offsets = defaultdict(int)
+    for fn in input_files:
+        f = h5py.File(fn, "r")
+        for key, dset in f["/data"].items():
+            n = dset.size
+            d[key][offsets[key]:offsets[key]+n] = dset[()]
+            offsets[key] += n
+        f.close()
 
     f_out.close()
 
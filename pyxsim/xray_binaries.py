@@ -1,14 +1,12 @@
 import numpy as np
 from yt.loaders import load_particles
-from yt.units.yt_array import uconcatenate, YTArray, \
-    YTQuantity
+from yt.units.yt_array import YTArray, YTQuantity
 from yt.utilities.physical_ratios import keV_per_erg
 from scipy.interpolate import InterpolatedUnivariateSpline
 from six import string_types
 from pyxsim.photon_list import make_photons
 from pyxsim.source_models import PowerLawSourceModel
-from pyxsim.utils import mylog, parse_value
-from soxs.utils import parse_prng
+from pyxsim.utils import mylog, parse_value, parse_prng
 
 """
 Papers used in this code:
@@ -137,6 +135,32 @@ def hmxb_cdf(L):
     return N
 
 
+def sample_xrbs(n_xrb, invcdf, lum_factor, bol_corr, alpha, scale,
+                pos, vel, prng):
+    # Fill preallocated arrays with the XRBs around each star particle,
+    # where n_xrb is the number of XRBs to generate for each star
+    n_tot = n_xrb.sum()
+    x, y, z, vx, vy, vz, l, r = np.empty((8, n_tot))
+    a = np.full(n_tot, alpha)
+    start = 0
+    for i in np.nonzero(n_xrb)[0]:
+        n = n_xrb[i]
+        end = start + n
+        randvec = prng.uniform(size=n)
+        l[start:end] = 10**invcdf(randvec)*1.0e38
+        x[start:end] = prng.normal(scale=scale[i], size=n) + pos[0][i]
+        y[start:end] = prng.normal(scale=scale[i], size=n) + pos[1][i]
+        z[start:end] = prng.normal(scale=scale[i], size=n) + pos[2][i]
+        vx[start:end] = vel[0][i]
+        vy[start:end] = vel[1][i]
+        vz[start:end] = vel[2][i]
+        start = end
+    r[:] = l*lum_factor
+    # Now convert output luminosities to bolometric
+    l *= bol_corr
+    return x, y, z, vx, vy, vz, l, r, a
+
+
 def make_xrb_particles(data_source, age_field, scale_length, 
                        sfr_time_range=(1.0, "Gyr"), prng=None):
     r"""
@@ -157,10 +181,10 @@ def make_xrb_particles(data_source, age_field, scale_length,
     sfr_time_range : string, (ftype, fname) tuple, (value, unit) tuple, :class:`~yt.units.yt_array.YTQuantity`, or :class:`~astropy.units.Quantity`, optional
         The recent time range over which to calculate the star formation rate from
         the current time in the dataset. Default: 1.0 Gyr
-    prng : integer or :class:`~numpy.random.RandomState` object 
+    prng : integer, :class:`~numpy.random.Generator`, or :class:`~numpy.random.RandomState` object 
         A pseudo-random number generator. Typically will only be specified
         if you have a reason to generate the same set of random numbers, such as for a
-        test. Default is to use the :mod:`numpy.random` module.
+        test. Default is a new :class:`~numpy.random.Generator`.
     """
     prng = parse_prng(prng)
 
@@ -221,15 +245,12 @@ def make_xrb_particles(data_source, age_field, scale_length,
     lmxb_factor = get_scale_factor(alpha_lmxb, emin_lmxb, emax_lmxb)
     hmxb_factor = get_scale_factor(alpha_hmxb, emin_hmxb, emax_hmxb)
 
-    xp = []
-    yp = []
-    zp = []
-    vxp = []
-    vyp = []
-    vzp = []
-    lp = []
-    rp = []
-    ap = []
+    pos = [data_source[ptype, f"particle_position_{ax}"].to_value("kpc")
+           for ax in "xyz"]
+    vel = [data_source[ptype, f"particle_velocity_{ax}"].to_value("km/s")
+           for ax in "xyz"]
+
+    xrbs = []
 
     if N_l > 0.0:
 
@@ -243,31 +264,8 @@ def make_xrb_particles(data_source, age_field, scale_length,
 
         mylog.info("Number of low-mass X-ray binaries: %s" % n_l.sum())
 
-        for i, n in enumerate(n_l):
-            if n > 0:
-                randvec = prng.uniform(size=n)
-                l = YTArray(10**invcdf_l(randvec)*1.0e38, "erg/s")
-                r = YTArray(l.v*lmxb_factor, "photons/s/keV")
-                # Now convert output luminosities to bolometric
-                l *= bc_lmxb
-                x = YTArray(prng.normal(scale=scale[i], size=n), "kpc")
-                y = YTArray(prng.normal(scale=scale[i], size=n), "kpc")
-                z = YTArray(prng.normal(scale=scale[i], size=n), "kpc")
-                x += data_source[ptype, "particle_position_x"][i].to("kpc")
-                y += data_source[ptype, "particle_position_y"][i].to("kpc")
-                z += data_source[ptype, "particle_position_z"][i].to("kpc")
-                vx = YTArray([data_source[ptype, "particle_velocity_x"][i]]*n).to('km/s')
-                vy = YTArray([data_source[ptype, "particle_velocity_y"][i]]*n).to('km/s')
-                vz = YTArray([data_source[ptype, "particle_velocity_z"][i]]*n).to('km/s')
-                xp.append(x)
-                yp.append(y)
-                zp.append(z)
-                vxp.append(vx)
-                vyp.append(vy)
-                vzp.append(vz)
-                lp.append(l)
-                rp.append(r)
-                ap.append(np.array([alpha_lmxb]*n))
+        xrbs.append(sample_xrbs(n_l, invcdf_l, lmxb_factor, bc_lmxb,
+                                alpha_lmxb, scale, pos, vel, prng))
 
     if N_h > 0.0:
 
@@ -281,50 +279,20 @@ def make_xrb_particles(data_source, age_field, scale_length,
 
         mylog.info("Number of high-mass X-ray binaries: %s" % n_h.sum())
 
-        for i, n in enumerate(n_h):
-            if n > 0:
-                randvec = prng.uniform(size=n)
-                l = YTArray(10**invcdf_h(randvec)*1.0e38, "erg/s")
-                r = YTArray(l.v*hmxb_factor, "photons/s/keV")
-                # Now convert output luminosities to bolometric
-                l *= bc_hmxb
-                x = YTArray(prng.normal(scale=scale[i], size=n), "kpc")
-                y = YTArray(prng.normal(scale=scale[i], size=n), "kpc")
-                z = YTArray(prng.normal(scale=scale[i], size=n), "kpc")
-                x += data_source[ptype, "particle_position_x"][i].to("kpc")
-                y += data_source[ptype, "particle_position_y"][i].to("kpc")
-                z += data_source[ptype, "particle_position_z"][i].to("kpc")
-                vx = YTArray([data_source[ptype, "particle_velocity_x"][i]]*n).to('km/s')
-                vy = YTArray([data_source[ptype, "particle_velocity_y"][i]]*n).to('km/s')
-                vz = YTArray([data_source[ptype, "particle_velocity_z"][i]]*n).to('km/s')
-                xp.append(x)
-                yp.append(y)
-                zp.append(z)
-                vxp.append(vx)
-                vyp.append(vy)
-                vzp.append(vz)
-                lp.append(l)
-                rp.append(r)
-                ap.append(np.array([alpha_hmxb]*n))
-
-    xp = uconcatenate(xp)
-    yp = uconcatenate(yp)
-    zp = uconcatenate(zp)
-    vxp = uconcatenate(vxp)
-    vyp = uconcatenate(vyp)
-    vzp = uconcatenate(vzp)
-    lp = uconcatenate(lp)
-    rp = uconcatenate(rp)
-    ap = uconcatenate(ap)
-
-    data = {"particle_position_x": (xp.d, str(xp.units)),
-            "particle_position_y": (yp.d, str(yp.units)),
-            "particle_position_z": (zp.d, str(zp.units)),
-            "particle_velocity_x": (vxp.d, str(vxp.units)),
-            "particle_velocity_y": (vyp.d, str(vyp.units)),
-            "particle_velocity_z": (vzp.d, str(vzp.units)),
-            "particle_luminosity": (lp.d, str(lp.units)),
-            "particle_count_rate": (rp.d, str(rp.units)),
+        xrbs.append(sample_xrbs(n_h, invcdf_h, hmxb_factor, bc_hmxb,
+                                alpha_hmxb, scale, pos, vel, prng))
+
+    xp, yp, zp, vxp, vyp, vzp, lp, rp, ap = \
+        [np.concatenate(fields) for fields in zip(*xrbs)]
+
+    data = {"particle_position_x": (xp, "kpc"),
+            "particle_position_y": (yp, "kpc"),
+            "particle_position_z": (zp, "kpc"),
+            "particle_velocity_x": (vxp, "km/s"),
+            "particle_velocity_y": (vyp, "km/s"),
+            "particle_velocity_z": (vzp, "km/s"),
+            "particle_luminosity": (lp, "erg/s"),
+            "particle_count_rate": (rp, "photons/s/keV"),
             "particle_spectral_index": ap}
 
     dle = ds.domain_left_edge.to("kpc").v
@@ -375,10 +343,10 @@ def make_xrb_photons(photon_prefix, ds, redshift, area, exp_time, emin, emax,
         Cosmological information. If not supplied, we try to get
         the cosmology from the dataset. Otherwise, LCDM with
         the default yt parameters is assumed.
-    prng : integer or :class:`~numpy.random.RandomState` object 
+    prng : integer, :class:`~numpy.random.Generator`, or :class:`~numpy.random.RandomState` object 
         A pseudo-random number generator. Typically will only be specified
         if you have a reason to generate the same set of random numbers, such as for a
-        test. Default is to use the :mod:`numpy.random` module.
+        test. Default is a new :class:`~numpy.random.Generator`.
     """
     dd = ds.all_data()
     e0 = (1.0, "keV")
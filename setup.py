@@ -7,6 +7,10 @@ cython_extensions = [
     Extension("pyxsim.lib.sky_functions",
               ["pyxsim/lib/sky_functions.pyx"],
               language="c", libraries=["m"],
+              include_dirs=[np.get_include()]),
+    Extension("pyxsim.lib.spectral_functions",
+              ["pyxsim/lib/spectral_functions.pyx"],
+              language="c", libraries=["m"],
               include_dirs=[np.get_include()])
 ]
 